@@ -0,0 +1,91 @@
+import collections
+import os
+import random
+import subprocess
+import auto_bench
+import bencher
+import builder
+import stats
+
+WORKTREE_DIR = os.path.join(".bench_cache", "worktrees")
+
+
+def git(args, cwd) -> str:
+    return subprocess.run(["git", *args], cwd=cwd, capture_output=True, check=True).stdout.decode().strip()
+
+
+def worktree(b, rev: str):
+    """Derive a builder for `b` that builds `rev` from its own detached worktree."""
+    top = git(["rev-parse", "--show-toplevel"], b.workdir)
+    commit = git(["rev-parse", rev + "^{commit}"], top)[:12]
+    path = os.path.abspath(os.path.join(WORKTREE_DIR, "{}-{}".format(os.path.basename(top), commit)))
+    if not os.path.exists(path):
+        git(["worktree", "add", "--detach", path, commit], top)
+    return builder.derive(b, "{}@{}".format(b.name, commit),
+                          workdir=os.path.join(path, os.path.relpath(b.workdir, top)))
+
+
+def run(allocator: str, rev_a: str, rev_b: str, benchers, time=10, seed=None):
+    """
+    Run two revisions of one allocator against the same benchers, alternating them in
+    randomized order inside every round so that machine drift hits both sides alike.
+    """
+    for name in benchers:
+        if name not in bencher.bencher_list:
+            raise ValueError("unknown bencher {}".format(name))
+        if bencher.bencher_list[name].rust:
+            raise ValueError("{} links allocator crates and cannot be A/B tested".format(name))
+    sides = [worktree(builder.builder_list[allocator], rev) for rev in (rev_a, rev_b)]
+    if sides[0].name == sides[1].name:
+        raise ValueError("{} and {} are the same commit".format(rev_a, rev_b))
+    for i in sides:
+        print("building", i.name)
+        i.build()
+    rng = random.Random(seed)
+    samples = {name: {i.name: collections.defaultdict(list) for i in sides} for name in benchers}
+    failed = set()
+    for r in range(time):
+        print("-- round #{}".format(r))
+        for name in benchers:
+            if name in failed:
+                continue
+            b = bencher.bencher_list[name]
+            order = list(sides)
+            rng.shuffle(order)
+            for side in order:
+                print("running", b.__name__, "with", side.name)
+                runner = auto_bench.make_runner(b, side)
+                try:
+                    runner.run()
+                    for i in b.attribute_list:
+                        samples[name][side.name][i].append(runner[i])
+                except Exception as e:
+                    print("Error during execution", e)
+                    print("STDERR", runner.stderr)
+                    print("CODE", runner.returncode)
+                    failed.add(name)
+                    break
+    res = {"a": sides[0].name, "b": sides[1].name}
+    for name in benchers:
+        if name in failed:
+            res[name] = None
+            continue
+        base, other = (samples[name][i.name] for i in sides)
+        res[name] = {i: stats.paired(base[i], other[i]) for i in bencher.bencher_list[name].attribute_list}
+    return res
+
+
+def report(res):
+    lines = ["A: {}, B: {}".format(res["a"], res["b"])]
+    for name, attrs in res.items():
+        if name in ("a", "b"):
+            continue
+        if attrs is None:
+            lines.append("{}: failed".format(name))
+            continue
+        for attr, s in attrs.items():
+            if s["rel_ci"]:
+                lines.append("{} {}: {:+.2f}% [{:+.2f}%, {:+.2f}%]".format(name, attr, s["rel"], *s["rel_ci"]))
+            else:
+                lines.append("{} {}: {} -> {}".format(name, attr, s["base"], s["other"]))
+    return "\n".join(lines)
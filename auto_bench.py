@@ -1,63 +1,108 @@
 import builder
 import collections
 import bencher
-import visual
+import telemetry
+from time import monotonic
 
-def auto_run_single(bencher, builder, time=5, ave=True):
+def make_runner(bencher, builder, extra_env=None):
     if bencher.rust:
         if not builder.crate_version:
             return None
-        else:
-            runner = bencher(builder.name)
-    else:
-        runner = bencher(builder.library())
+        return bencher(builder.name)
+    runner = bencher(builder.library())
+    if extra_env:
+        runner.env.update(extra_env)
+    return runner
+
+
+def applicable(bencher, b):
+    if bencher.rust:
+        return b.crate_version is not None
+    return not isinstance(b, builder.RustOnly)
+
+
+def cells(benchers, builders):
+    return [telemetry.cell_name(i, j) for i in benchers for j in builders if applicable(i, j)]
+
+
+def auto_run_single(bencher, builder, time=5, ave=True):
+    runner = make_runner(bencher, builder)
+    if runner is None:
+        return None
     result = collections.defaultdict(list)
+    progress = telemetry.current
+    cell = telemetry.cell_name(bencher, builder)
+    began = progress.begin([cell], time)
+    progress.start_cell(cell, time)
     try:
         for i in range(time):
             print("-- round #{}".format(i))
+            progress.start_round(i)
+            start = monotonic()
             runner.run()
-            for i in bencher.attribute_list:
-                result[i].append(runner[i])
+            progress.end_round(i, monotonic() - start)
+            for j in bencher.attribute_list:
+                result[j].append(runner[j])
         if ave:
             for i in bencher.attribute_list:
                 result[i] = sum(result[i]) / time
-        return result
+        progress.end_cell()
     except Exception as e:
         print("Error during execution", e)
         print("STDERR", runner.stderr)
         print("CODE", runner.returncode)
-        return None
+        progress.end_cell(str(e))
+        result = None
+    if began:
+        progress.finish()
+    return result
+
+
+def visualize(bencher, res):
+    import visual
+    visual.plot(bencher, res)
+    if hasattr(bencher, "latency_ops"):
+        visual.plot_percentiles(bencher, res)
 
 
 def auto_run_bencher(bencher, time=5, ave=True, vis=True):
     res = dict()
+    began = telemetry.current.begin(cells([bencher], builder.builder_list.values()), time)
     for b in builder.builder_list.values():
-        if bencher.rust and b.crate_version is None:
+        if not applicable(bencher, b):
             continue
-        if isinstance(b, builder.RustOnly) and not bencher.rust:
-            continue 
         print("running", bencher.__name__, "with", b.name)
         single = auto_run_single(bencher, b, time, ave or vis)
         res[b.name] = single
     if vis:
-        visual.plot(bencher, res)
+        visualize(bencher, res)
+    if began:
+        telemetry.current.finish()
     return res
 
 
 def auto_run_builder(builder, time=5, ave=True):
     res = dict()
+    began = telemetry.current.begin(cells(bencher.bencher_list.values(), [builder]), time)
     for b in bencher.bencher_list.values():
+        if not applicable(b, builder):
+            continue
         print("running", b.__name__, "with", builder.name)
         single = auto_run_single(b, builder, time, ave)
         res[b.__name__] = single
+    if began:
+        telemetry.current.finish()
     return res
 
 
 def run_all(time=5, ave=True, vis=True):
     res = dict()
+    began = telemetry.current.begin(cells(bencher.bencher_list.values(), builder.builder_list.values()), time)
     for b in bencher.bencher_list.values():
         single = auto_run_bencher(b, time, ave, vis)
         res[b.__name__] = single
+    if began:
+        telemetry.current.finish()
     return res
 
 
@@ -1,39 +1,174 @@
+import concurrent.futures
+import glob
+import hashlib
+import json
 import os
-import subprocess
 import shutil
+import subprocess
 import multiprocessing
-def clean():
-    path = os.path.abspath(".")
-    shutil.rmtree("benchmark", ignore_errors=True)
-    os.chdir("mimalloc-bench/bench/shbench")
-    subprocess.run(["git", "clean", "-fdx"])
-    subprocess.run(["git", "reset", "--hard"])
-    os.chdir(path)
+import threading
+import fingerprint
+
+SHBENCH = "mimalloc-bench/bench/shbench"
+EBIZZY = "ltp/utils/benchmark/ebizzy-0.3"
+AGDA = "agda-stdlib/src"
+STATE_FILE = os.path.join(fingerprint.CACHE_DIR, "build_state.json")
+
+# source archives that are not part of any submodule; a copy placed in vendor/ is used as is,
+# otherwise they are downloaded once into the cache so later builds work offline
+ARCHIVES = {
+    "bench.zip": "http://www.microquill.com/smartheap/shbench/bench.zip",
+    "SH8BENCH.zip": "http://www.microquill.com/smartheap/SH8BENCH.zip",
+}
+VENDOR_DIR = "vendor"
+ARCHIVE_DIR = os.path.join(fingerprint.CACHE_DIR, "archives")
+
+# standalone drivers compiled straight into benchmark/: name -> (source, extra flags)
+DRIVERS = {
+    "malloc-latency": ("drivers/malloc_latency.c", ()),
+    "fork-bench": ("drivers/fork_bench.c", ()),
+    "memory-decay": ("drivers/memory_decay.c", ("-rdynamic",)),
+}
+
+state_lock = threading.Lock()
+
+
+def run(cmd, cwd=None) -> bool:
+    try:
+        return subprocess.run(cmd, cwd=cwd).returncode == 0
+    except FileNotFoundError as e:
+        print("cannot run", cmd[0], e)
+        return False
+
+
+def digest(*paths, extra=()) -> str:
+    """Hash the contents of files and directory trees, together with any extra strings."""
+    res = hashlib.sha256()
+    for i in extra:
+        res.update(i.encode() + b"\0")
+    for path in paths:
+        files = [path]
+        if os.path.isdir(path):
+            files = sorted(os.path.join(root, f) for root, _, names in os.walk(path) for f in names)
+        for f in files:
+            res.update(f.encode() + b"\0")
+            if os.path.isfile(f):
+                with open(f, "rb") as file:
+                    res.update(hashlib.sha256(file.read()).digest())
+    return res.hexdigest()
+
+
+def load_state():
+    try:
+        with open(STATE_FILE) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+
+def step(state, name, inputs, outputs, action):
+    """Run `action` unless the digest of `inputs` is unchanged since its last success and `outputs` exist."""
+    if state.get(name) == inputs() and all(os.path.exists(i) for i in outputs):
+        print("up to date: " + name)
+        return True
+    print("building: " + name)
+    if not action():
+        print("failed: " + name)
+        return False
+    with state_lock:
+        state[name] = inputs()
+        os.makedirs(fingerprint.CACHE_DIR, exist_ok=True)
+        with open(STATE_FILE, "w+") as file:
+            json.dump(state, file)
+    return True
+
 
-def compile():
+def archive(name) -> str:
+    vendored = os.path.join(VENDOR_DIR, name)
+    if os.path.exists(vendored):
+        return os.path.abspath(vendored)
+    cached = os.path.join(ARCHIVE_DIR, name)
+    if not os.path.exists(cached):
+        os.makedirs(ARCHIVE_DIR, exist_ok=True)
+        if not run(["wget", "-O", cached + ".part", ARCHIVES[name]]):
+            raise RuntimeError("cannot fetch {}, place it in {}/".format(name, VENDOR_DIR))
+        os.rename(cached + ".part", cached)
+    return os.path.abspath(cached)
+
+
+def prepare_shbench(state) -> bool:
     try:
-        os.mkdir("benchmark")
-        path = os.path.abspath("benchmark")
-        cmake = os.path.abspath("mimalloc-bench/bench")
-        os.chdir("mimalloc-bench/bench/shbench")
-        subprocess.run(["wget", "-N", "http://www.microquill.com/smartheap/shbench/bench.zip"])
-        subprocess.run(["wget", "-N", "http://www.microquill.com/smartheap/SH8BENCH.zip"])
-        subprocess.run(["unzip", "-o", "bench.zip"])
-        subprocess.run(["unzip", "-o", "SH8BENCH.zip"])
-        for i in ["sh6bench.patch", "sh6bench.c", "sh8bench.patch", "SH8BENCH.C"]:
-            subprocess.run(["dos2unix", i])
-        subprocess.run((["patch","-p1", "-o", "sh6bench-new.c", "sh6bench.c", "sh6bench.patch"]))
-        subprocess.run((["patch", "-p1", "-o", "sh8bench-new.c", "SH8BENCH.C", "sh8bench.patch"]))
-        os.chdir(path)
-        subprocess.run(["cmake", cmake, "-DCMAKE_BUILD_TYPE=Release"])
-        subprocess.run(["cmake", "--build", ".", "--parallel", str(multiprocessing.cpu_count())])
-    except FileExistsError:
-        print("use existing benchmark dir")
-    # run once before really start
-    subprocess.run(["agda", "./IO.agda"], cwd="agda-stdlib/src")
-    ebizzy = "ltp/utils/benchmark/ebizzy-0.3"
-    os.chmod(ebizzy + "/configure", 0o777)
-    subprocess.run(["sh", "./configure"], cwd=ebizzy)
-    subprocess.run(["make"], cwd=ebizzy)
+        archives = [archive(i) for i in ARCHIVES]
+    except RuntimeError as e:
+        print(e)
+        return False
+    patches = [os.path.join(SHBENCH, i) for i in ("sh6bench.patch", "sh8bench.patch")]
+
+    def action():
+        return all(run(["unzip", "-o", i], cwd=SHBENCH) for i in archives) \
+               and all(run(["dos2unix", i], cwd=SHBENCH)
+                       for i in ["sh6bench.patch", "sh6bench.c", "sh8bench.patch", "SH8BENCH.C"]) \
+               and run(["patch", "-p1", "-o", "sh6bench-new.c", "sh6bench.c", "sh6bench.patch"], cwd=SHBENCH) \
+               and run(["patch", "-p1", "-o", "sh8bench-new.c", "SH8BENCH.C", "sh8bench.patch"], cwd=SHBENCH)
+
+    return step(state, "shbench", lambda: digest(*archives, *patches),
+                [os.path.join(SHBENCH, "sh6bench-new.c"), os.path.join(SHBENCH, "sh8bench-new.c")], action)
+
+
+def build_cmake(state) -> bool:
+    if not prepare_shbench(state):
+        return False
+    source = os.path.abspath("mimalloc-bench/bench")
+
+    def action():
+        return (os.path.exists("benchmark/CMakeCache.txt")
+                or run(["cmake", source, "-DCMAKE_BUILD_TYPE=Release"], cwd="benchmark")) \
+               and run(["cmake", "--build", ".", "--parallel", str(multiprocessing.cpu_count())], cwd="benchmark")
+
+    return step(state, "cmake", lambda: digest(source), ["benchmark/CMakeCache.txt"], action)
+
+
+def build_driver(state, name) -> bool:
+    source, flags = DRIVERS[name]
+    output = os.path.join("benchmark", name)
+    headers = sorted(glob.glob("drivers/*.h"))
+    return step(state, "driver:" + name, lambda: digest(source, *headers, extra=flags), [output],
+                lambda: run(["cc", "-O2", "-pthread", source, "-o", output, *flags]))
+
+
+def build_ebizzy(state) -> bool:
+    def action():
+        os.chmod(EBIZZY + "/configure", 0o777)
+        return run(["sh", "./configure"], cwd=EBIZZY) and run(["make"], cwd=EBIZZY)
+
+    return step(state, "ebizzy",
+                lambda: digest(*sorted(glob.glob(EBIZZY + "/*.[ch]")), EBIZZY + "/configure"),
+                [EBIZZY + "/ebizzy"], action)
+
+
+def warm_agda(state) -> bool:
+    # run once before really start, so that the benchmark does not time the standard library build
+    agda = shutil.which("agda") or "agda"
+    return step(state, "agda",
+                lambda: digest(extra=[fingerprint.submodule_head("agda-stdlib"), agda,
+                                      str(os.path.exists(agda) and os.stat(agda).st_mtime_ns)]),
+                [], lambda: run(["agda", "./IO.agda"], cwd=AGDA))
+
+
+def clean():
+    shutil.rmtree("benchmark", ignore_errors=True)
+    subprocess.run(["git", "clean", "-fdx"], cwd=SHBENCH)
+    subprocess.run(["git", "reset", "--hard"], cwd=SHBENCH)
+    if os.path.exists(STATE_FILE):
+        os.remove(STATE_FILE)
 
 
+def compile() -> bool:
+    """Build every workload whose inputs changed since the last successful build, independent ones concurrently."""
+    os.makedirs("benchmark", exist_ok=True)
+    state = load_state()
+    tasks = [(build_cmake, ()), (build_ebizzy, ()), (warm_agda, ())]
+    tasks += [(build_driver, (i,)) for i in DRIVERS]
+    with concurrent.futures.ThreadPoolExecutor(len(tasks)) as pool:
+        futures = [pool.submit(f, state, *args) for f, args in tasks]
+        return all(i.result() for i in futures)
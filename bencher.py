@@ -1,3 +1,4 @@
+import json
 import tempfile
 import subprocess
 import multiprocessing
@@ -18,10 +19,18 @@ BARNES_TEMPLATE = """
 1
 """
 
+LATENCY_OPS = ("malloc", "free")
+LATENCY_PERCENTILES = ("p50", "p99", "p999", "max")
+
+
+COUNT_ATTRIBUTES = ("allocs", "frees", "reallocs", "bytes_requested", "peak_live", "ns_per_alloc", "live_ratio",
+                    "alloc_threads", "max_thread_share")
+
 
 class RustBencher:
     attribute_list = ("mem_peak", "time_elapsed", "page_fault")
     rust = True
+    count_alloc = False
 
     def __init__(self, module: str, lib: str, args=()):
         self.lib = lib
@@ -33,14 +42,19 @@ class RustBencher:
         self.stdout = None
         self.stderr = None
         self.returncode = None
+        for i in COUNT_ATTRIBUTES:
+            self.__dict__[i] = None
 
     def __getitem__(self, item):
         return self.__dict__[item]
 
     def run(self):
+        features = "bench_{}".format(self.lib)
+        if self.count_alloc:
+            features += ",count_alloc"
         with tempfile.NamedTemporaryFile() as record:
             child = subprocess.run(["env", "time", "-f", "%R %M", "-o", record.name, "cargo", "run", "--release",
-                                    "--features=bench_{}".format(self.lib),
+                                    "--features={}".format(features),
                                     "--", self.module, *self.args],
                                    cwd="rust_bencher", capture_output=True)
             time.sleep(0.5)  # sometimes closing file proves to be slow
@@ -52,6 +66,33 @@ class RustBencher:
                 res = file.readline().split()
                 self.mem_peak = int(res[1].strip())
                 self.page_fault = int(res[0].strip())
+        if self.count_alloc:
+            self.parse_alloc_stats()
+
+    def parse_alloc_stats(self):
+        for line in self.stderr.decode().splitlines():
+            if line.startswith("alloc-stats "):
+                stats = json.loads(line[len("alloc-stats "):])
+                break
+        else:
+            raise ValueError("no allocation statistics in output")
+        self.allocs = stats["allocs"]
+        self.frees = stats["frees"]
+        self.reallocs = stats["reallocs"]
+        self.bytes_requested = stats["bytes"]
+        self.peak_live = stats["peak_live"] // 1024  # KiB, as mem_peak
+        self.ns_per_alloc = self.time_elapsed * 1e6 / max(self.allocs, 1)
+        self.live_ratio = self.peak_live / self.mem_peak
+        # how the allocations spread over threads: slots used, and the busiest thread's share
+        threads = [i for i in stats["thread_allocs"] if i]
+        self.alloc_threads = len(threads)
+        self.max_thread_share = max(threads, default=0) / max(self.allocs, 1)
+
+
+def counted(bencher):
+    """A variant of a Rust bencher whose allocator is wrapped in the counting layer."""
+    return type(bencher.__name__ + "Counted", (bencher,),
+                {"count_alloc": True, "attribute_list": bencher.attribute_list + COUNT_ATTRIBUTES})
 
 
 class Xactor(RustBencher):
@@ -356,6 +397,144 @@ class Ebizzy(PreloadBencher):
         self.op_per_sec = int(output[0])
 
 
+class MallocLatency(PreloadBencher):
+    latency_ops = LATENCY_OPS
+    latency_percentiles = LATENCY_PERCENTILES
+    attribute_list = ("mem_peak", "time_elapsed", "page_fault") + tuple(
+        "{}_{}".format(op, p) for op in LATENCY_OPS for p in LATENCY_PERCENTILES)
+
+    def __init__(self, lib_path=None, thd=None, ops=1000000, min_size=16, max_size=4096):
+        if thd:
+            self.thd = thd
+        else:
+            self.thd = multiprocessing.cpu_count()
+        for op in LATENCY_OPS:
+            for p in LATENCY_PERCENTILES:
+                self.__dict__["{}_{}".format(op, p)] = None
+        super().__init__("benchmark/malloc-latency", args=[str(self.thd), str(ops), str(min_size), str(max_size)],
+                         lib_path=lib_path)
+
+    def run(self):
+        super().run()
+        for line in self.stdout.splitlines():
+            output = line.split()
+            if output and output[0] in LATENCY_OPS:
+                for p, value in zip(LATENCY_PERCENTILES, output[1:]):
+                    self.__dict__["{}_{}".format(output[0], p)] = float(value)
+
+
+class MallocLatencyLarge(MallocLatency):
+    def __init__(self, lib_path=None, thd=None):
+        super().__init__(lib_path, thd, ops=100000, min_size=65536, max_size=1048576)
+
+
+class MallocLatencySingle(MallocLatency):
+    def __init__(self, lib_path=None, thd=1):
+        super().__init__(lib_path, thd)
+
+
+class ForkBench(PreloadBencher):
+    attribute_list = ("mem_peak", "time_elapsed", "page_fault", "fork_latency", "fork_max", "child_start",
+                      "first_alloc", "child_faults")
+
+    def __init__(self, lib_path=None, thd=1, heap_mib=256, min_size=16, max_size=1024, forks=200, child_ops=1000):
+        self.thd = thd
+        self.fork_latency = None
+        self.fork_max = None
+        self.child_start = None
+        self.first_alloc = None
+        self.child_faults = None
+        super().__init__("benchmark/fork-bench",
+                         args=[str(self.thd), str(heap_mib), str(min_size), str(max_size), str(forks),
+                               str(child_ops)],
+                         lib_path=lib_path)
+
+    def run(self):
+        super().run()
+        if self.returncode != 0:
+            raise RuntimeError("fork-bench failed: " + self.stderr.strip())
+        output = {i.split()[0]: i.split()[1:] for i in self.stdout.splitlines() if i}
+        # the driver reports nanoseconds; every timing attribute is kept in microseconds
+        self.fork_latency = float(output["fork"][0]) / 1000.0
+        self.fork_max = float(output["fork"][1]) / 1000.0
+        self.child_start = float(output["child_start"][0]) / 1000.0
+        self.first_alloc = float(output["first_alloc"][0]) / 1000.0
+        self.child_faults = float(output["child_faults"][0])
+
+
+class ForkThreaded(ForkBench):
+    def __init__(self, lib_path=None, thd=None):
+        if not thd:
+            thd = multiprocessing.cpu_count()
+        super().__init__(lib_path, thd)
+
+
+class MemoryDecay(PreloadBencher):
+    # decay_time is the full idle length when RSS never fell below the threshold; decay_reached
+    # (1 or 0, so its average is the fraction of runs that decayed) tells the two apart
+    attribute_list = ("mem_peak", "page_fault", "after_free_rss", "retained_rss", "decay_time", "decay_reached",
+                      "madvise_calls", "munmap_calls", "reuse_faults")
+
+    def __init__(self, lib_path=None, burst_mib=512, min_size=16, max_size=16384, idle=60, reuse=50, threshold=10):
+        self.after_free_rss = None
+        self.retained_rss = None
+        self.decay_time = None
+        self.decay_reached = None
+        self.madvise_calls = None
+        self.munmap_calls = None
+        self.reuse_faults = None
+        super().__init__("benchmark/memory-decay",
+                         args=[str(burst_mib), str(min_size), str(max_size), str(idle), str(reuse), str(threshold)],
+                         lib_path=lib_path)
+
+    def run(self):
+        super().run()
+        output = {i.split()[0]: i.split()[1:] for i in self.stdout.splitlines() if i}
+        self.after_free_rss = int(output["after_free_rss"][0])
+        self.retained_rss = int(output["retained_rss"][0])
+        self.decay_time = float(output["decay_time"][0])
+        self.decay_reached = int(output["decay_time"][1])
+        self.madvise_calls = int(output["madvise"][0])
+        self.munmap_calls = int(output["munmap"][0])
+        self.reuse_faults = int(output["reuse_faults"][0])
+
+
+class PythonBencher(PreloadBencher):
+    """Runs a CPython workload with PYTHONMALLOC=malloc so every allocation reaches the preloaded allocator."""
+    attribute_list = ("mem_peak", "time_elapsed", "page_fault", "op_per_sec")
+
+    def __init__(self, script: str, lib_path=None, args=()):
+        self.op_per_sec = None
+        super().__init__("python3", args=["drivers/python/" + script, *args], extra_env={"PYTHONMALLOC": "malloc"},
+                         lib_path=lib_path)
+
+    def run(self):
+        super().run()
+        output = self.stdout.split()
+        self.time_elapsed = float(output[-1])
+        self.op_per_sec = float(output[-2]) / self.time_elapsed
+
+
+class PyDictChurn(PythonBencher):
+    def __init__(self, lib_path=None):
+        super().__init__("dict_churn.py", lib_path=lib_path)
+
+
+class PyJson(PythonBencher):
+    def __init__(self, lib_path=None):
+        super().__init__("json_roundtrip.py", lib_path=lib_path)
+
+
+class PyAsyncio(PythonBencher):
+    def __init__(self, lib_path=None):
+        super().__init__("asyncio_server.py", lib_path=lib_path)
+
+
+class PySQLite(PythonBencher):
+    def __init__(self, lib_path=None):
+        super().__init__("sqlite_bulk.py", lib_path=lib_path)
+
+
 bencher_list = {
     "c_frac": CFrac,
     "malloc_large": MallocLarge,
@@ -375,6 +554,16 @@ bencher_list = {
     "cache_scratch": CacheScratch,
     "cache_thrash": CacheThrash,
     "ebizzy": Ebizzy,
+    "malloc_latency": MallocLatency,
+    "malloc_latency_large": MallocLatencyLarge,
+    "malloc_latency_single": MallocLatencySingle,
+    "fork": ForkBench,
+    "fork_threaded": ForkThreaded,
+    "memory_decay": MemoryDecay,
+    "py_dict_churn": PyDictChurn,
+    "py_json": PyJson,
+    "py_asyncio": PyAsyncio,
+    "py_sqlite": PySQLite,
     "xactor": Xactor,
     "btree": BTree,
     "skiplist": Skiplist,
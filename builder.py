@@ -1,3 +1,4 @@
+import copy
 import multiprocessing
 import subprocess
 import shutil
@@ -194,5 +195,27 @@ builder_list = {
 }
 
 
+def derive(b, name: str, workdir: Optional[str] = None, options: Optional[Iterable] = None):
+    """
+    Copy a source builder under a new name, optionally pointing it at another source tree
+    or replacing its build options. A CMAKEBuilder builds in a directory named after the
+    builder, so its variants never share build outputs; a GeneralBuilder builds in place,
+    so new options need a separate `workdir` to keep the original build intact.
+    """
+    if not isinstance(b, (CMAKEBuilder, GeneralBuilder)):
+        raise ValueError("{} is not built from source".format(b.name))
+    if options is not None and isinstance(b, GeneralBuilder) and workdir is None:
+        raise ValueError("{} builds in place, deriving it with new options needs another workdir".format(b.name))
+    res = copy.copy(b)
+    res.name = name
+    if workdir:
+        res.workdir = os.path.abspath(workdir)
+    if options is not None:
+        res.options = list(options)
+    if isinstance(res, GeneralBuilder) and res.prepare:
+        res.prepare = types.MethodType(res.prepare.__func__, res)
+    return res
+
+
 def build_all() -> List[Tuple[str, str, str]]:
     return [(i.name, i.version(), i.build()) for i in builder_list.values()]
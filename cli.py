@@ -1,18 +1,46 @@
-import fire
-import auto_bench
+import json
+import sys
 import bencher
 import builder
-import bench_suite
-import json
+
+# commands answered without loading fire or the runner modules, so introspection stays fast
+FAST_COMMANDS = ("list_allocators", "list_benches", "fingerprint")
+
+
+def as_list(names):
+    if isinstance(names, str):
+        return names.split(",")
+    return list(names)
+
+
+def observe(events, metrics_port):
+    import telemetry
+    if events:
+        telemetry.current.add_stream(events)
+    if metrics_port:
+        telemetry.current.serve(int(metrics_port))
+
+
+def select(name, count_alloc=False):
+    b = bencher.bencher_list[name]
+    if count_alloc:
+        if not b.rust:
+            raise ValueError("allocation counting is only available for Rust benchers")
+        b = bencher.counted(b)
+    return b
+
 
 class MallocBench:
     """Memory allocator benchmark suite"""
 
     def clean_bench_suite(self):
+        import bench_suite
         bench_suite.clean()
 
     def compile_bench_suite(self):
-        bench_suite.compile()
+        import bench_suite
+        if not bench_suite.compile():
+            print("some workloads failed to build")
 
     def compile_allocator(self, name: str):
         print(builder.builder_list[name].build())
@@ -35,19 +63,64 @@ class MallocBench:
         for i in bencher.bencher_list.keys():
             print(i)
 
-    def run(self, allocator_name: str, bencher_name: str, time: int = 1, ave=True):
-        res = auto_bench.auto_run_single(bencher.bencher_list[bencher_name], builder.builder_list[allocator_name], time, ave)
+    def fingerprint(self):
+        import fingerprint
+        print(json.dumps(fingerprint.fingerprint()))
+
+    def run(self, allocator_name: str, bencher_name: str, time: int = 1, ave=True, events=None, metrics_port=None,
+            count_alloc=False):
+        import auto_bench
+        observe(events, metrics_port)
+        res = auto_bench.auto_run_single(select(bencher_name, count_alloc), builder.builder_list[allocator_name], time,
+                                         ave)
         print(json.dumps(res))
 
-    def run_bencher(self, name: str, time: int=1, ave=True, vis=True):
-        res = auto_bench.auto_run_bencher(bencher.bencher_list[name], time, ave, vis)
+    def run_bencher(self, name: str, time: int=1, ave=True, vis=True, events=None, metrics_port=None,
+                    count_alloc=False):
+        import auto_bench
+        observe(events, metrics_port)
+        res = auto_bench.auto_run_bencher(select(name, count_alloc), time, ave, vis)
         print(json.dumps(res))
 
-    def run_allocator(self, name: str, time: int = 1, ave=True):
+    def run_allocator(self, name: str, time: int = 1, ave=True, events=None, metrics_port=None):
+        import auto_bench
+        observe(events, metrics_port)
         res = auto_bench.auto_run_builder(builder.builder_list[name], time, ave)
         print(json.dumps(res))
 
-    def run_all(self,time: int=1, ave=True, vis=True, save=True):
+    def ab(self, allocator_name: str, rev_a: str, rev_b: str, benchers, time: int = 10, seed=None):
+        import ab_test
+        res = ab_test.run(allocator_name, rev_a, rev_b, as_list(benchers), time, seed)
+        print(ab_test.report(res))
+        print(json.dumps(res))
+
+    def tune(self, allocator_name: str, benchers, time: int = 3, search="grid", eta: int = 2, metric=None,
+             save=True):
+        import tuning
+        res = tuning.tune(allocator_name, as_list(benchers), time, search, eta, metric, save)
+        for name, i in res.items():
+            print(name, "best:", i["best"])
+        print(json.dumps(res))
+
+    def plan(self, budget, benchers=None, allocators=None, min_rounds: int = 3, max_rounds: int = 10,
+             dry_run=False, vis=True, events=None, metrics_port=None):
+        import planner
+        p = planner.plan(planner.parse_duration(budget), benchers and as_list(benchers),
+                         allocators and as_list(allocators), min_rounds, max_rounds)
+        for i in p["cells"]:
+            print("plan", i["bencher"], i["allocator"], i["rounds"], "rounds", "~{:.0f}s".format(i["estimate"]))
+        if dry_run:
+            print(json.dumps(p))
+            return
+        observe(events, metrics_port)
+        res = planner.run_plan(p, vis)
+        for i in res["not_run"]:
+            print("not run", i)
+        print(json.dumps(res))
+
+    def run_all(self,time: int=1, ave=True, vis=True, save=True, events=None, metrics_port=None):
+        import auto_bench
+        observe(events, metrics_port)
         res = auto_bench.run_all(time, ave, vis)
         j_data = json.dumps(res)
         print(j_data)
@@ -57,4 +130,8 @@ class MallocBench:
 
 
 if __name__ == '__main__':
-    fire.Fire(MallocBench)
+    if len(sys.argv) == 2 and sys.argv[1] in FAST_COMMANDS:
+        getattr(MallocBench(), sys.argv[1])()
+    else:
+        import fire
+        fire.Fire(MallocBench)
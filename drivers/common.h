@@ -0,0 +1,53 @@
+/*
+ * Helpers shared by the standalone drivers. Everything here avoids the allocator under
+ * test: nothing allocates through malloc, and bookkeeping memory comes from map().
+ */
+#ifndef BENCH_DRIVERS_COMMON_H
+#define BENCH_DRIVERS_COMMON_H
+
+#include <stdint.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <sys/mman.h>
+#include <sys/resource.h>
+#include <time.h>
+
+/* fixed so that runs against different allocators see the same sequence of sizes */
+#define SEED 0xffff114514abcdefull
+
+/* an independent seed for the i-th thread */
+static inline uint64_t thread_seed(size_t i) {
+    return SEED ^ ((i + 1) * 0x9e3779b97f4a7c15ull);
+}
+
+static inline uint64_t now_ns(void) {
+    struct timespec ts;
+    clock_gettime(CLOCK_MONOTONIC, &ts);
+    return (uint64_t) ts.tv_sec * 1000000000ull + (uint64_t) ts.tv_nsec;
+}
+
+/* xorshift64 */
+static inline uint64_t next(uint64_t *s) {
+    *s ^= *s << 13;
+    *s ^= *s >> 7;
+    *s ^= *s << 17;
+    return *s;
+}
+
+static inline long minor_faults(void) {
+    struct rusage usage;
+    getrusage(RUSAGE_SELF, &usage);
+    return usage.ru_minflt;
+}
+
+/* bookkeeping is mapped directly so it never goes through the allocator under test */
+static inline void *map(size_t bytes) {
+    void *res = mmap(NULL, bytes, PROT_READ | PROT_WRITE, MAP_PRIVATE | MAP_ANONYMOUS, -1, 0);
+    if (res == MAP_FAILED) {
+        perror("mmap");
+        exit(1);
+    }
+    return res;
+}
+
+#endif
@@ -0,0 +1,192 @@
+/*
+ * Fork latency on a populated heap.
+ *
+ * usage: fork-bench <threads> <heap MiB> <min size> <max size> <forks> <child ops>
+ *
+ * The parent fills a heap of the given size with blocks of random size, split across
+ * <threads> threads. All threads but the main one then keep allocating and freeing while
+ * the main thread forks <forks> times, so forks land while other threads hold allocator
+ * locks. Every child times its first malloc, does <child ops> malloc/free pairs, frees
+ * part of the inherited heap (dirtying allocator metadata shared copy-on-write with the
+ * parent) and reports back through a pipe before exiting. A child that has not reported
+ * within CHILD_TIMEOUT_MS is killed and the run fails. Output, times in nanoseconds:
+ *
+ *     fork <mean> <max>            fork() as seen by the parent
+ *     child_start <mean>           from calling fork() to the child running
+ *     first_alloc <mean> <max>     the first malloc in the child
+ *     child_faults <mean>          minor page faults taken by the child
+ */
+#define _GNU_SOURCE
+#include <poll.h>
+#include <pthread.h>
+#include <signal.h>
+#include <stdatomic.h>
+#include <stdint.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <sys/wait.h>
+#include <time.h>
+#include <unistd.h>
+#include "common.h"
+
+#define WINDOW 1024
+#define CHILD_TIMEOUT_MS 10000
+
+struct worker {
+    pthread_t thread;
+    uint64_t seed;
+    size_t bytes;
+    size_t count;
+    void **blocks;
+};
+
+struct child_report {
+    uint64_t start;
+    uint64_t first_alloc;
+    uint64_t faults;
+};
+
+static size_t min_size, max_size;
+static pthread_barrier_t ready;
+static atomic_int stop;
+
+static inline size_t random_size(uint64_t *seed) {
+    return min_size + next(seed) % (max_size - min_size + 1);
+}
+
+static void populate(struct worker *w) {
+    size_t filled = 0;
+    while (filled < w->bytes) {
+        size_t size = random_size(&w->seed);
+        char *p = malloc(size);
+        p[0] = 1;
+        w->blocks[w->count++] = p;
+        filled += size;
+    }
+}
+
+static void *work(void *arg) {
+    struct worker *w = arg;
+    void *window[WINDOW] = {0};
+    populate(w);
+    pthread_barrier_wait(&ready);
+    while (!atomic_load_explicit(&stop, memory_order_relaxed)) {
+        size_t i = next(&w->seed) % WINDOW;
+        free(window[i]);
+        window[i] = malloc(random_size(&w->seed));
+    }
+    for (size_t i = 0; i < WINDOW; ++i) {
+        free(window[i]);
+    }
+    return NULL;
+}
+
+static void child(struct worker *w, size_t ops, uint64_t forked, int fd) {
+    struct child_report report;
+    report.start = now_ns() - forked;
+    long faults = minor_faults();
+    uint64_t t0 = now_ns();
+    void *first = malloc(random_size(&w->seed));
+    report.first_alloc = now_ns() - t0;
+    free(first);
+    void *window[WINDOW] = {0};
+    for (size_t i = 0; i < ops; ++i) {
+        size_t slot = next(&w->seed) % WINDOW;
+        free(window[slot]);
+        window[slot] = malloc(random_size(&w->seed));
+    }
+    for (size_t i = 0; i < w->count; i += 8) {
+        free(w->blocks[i]);
+    }
+    report.faults = (uint64_t) (minor_faults() - faults);
+    if (write(fd, &report, sizeof(report)) != sizeof(report)) {
+        _exit(1);
+    }
+    _exit(0);
+}
+
+int main(int argc, char **argv) {
+    if (argc != 7) {
+        fprintf(stderr, "usage: %s <threads> <heap MiB> <min size> <max size> <forks> <child ops>\n", argv[0]);
+        return 1;
+    }
+    size_t threads = strtoull(argv[1], NULL, 10);
+    size_t heap = strtoull(argv[2], NULL, 10) << 20;
+    min_size = strtoull(argv[3], NULL, 10);
+    max_size = strtoull(argv[4], NULL, 10);
+    size_t forks = strtoull(argv[5], NULL, 10);
+    size_t ops = strtoull(argv[6], NULL, 10);
+    if (threads == 0 || forks == 0 || min_size == 0 || max_size < min_size) {
+        fprintf(stderr, "invalid arguments\n");
+        return 1;
+    }
+    struct worker *workers = map(sizeof(struct worker) * threads);
+    for (size_t i = 0; i < threads; ++i) {
+        workers[i].seed = thread_seed(i);
+        workers[i].bytes = heap / threads;
+        workers[i].blocks = map(sizeof(void *) * (workers[i].bytes / min_size + 1));
+    }
+    pthread_barrier_init(&ready, NULL, (unsigned) threads);
+    for (size_t i = 1; i < threads; ++i) {
+        pthread_create(&workers[i].thread, NULL, work, &workers[i]);
+    }
+    populate(&workers[0]);
+    pthread_barrier_wait(&ready);
+
+    uint64_t fork_total = 0, fork_max = 0, start_total = 0, alloc_total = 0, alloc_max = 0, fault_total = 0;
+    for (size_t i = 0; i < forks; ++i) {
+        int fds[2];
+        if (pipe(fds) != 0) {
+            perror("pipe");
+            return 1;
+        }
+        uint64_t t0 = now_ns();
+        pid_t pid = fork();
+        if (pid == 0) {
+            close(fds[0]);
+            child(&workers[0], ops, t0, fds[1]);
+        }
+        uint64_t elapsed = now_ns() - t0;
+        if (pid < 0) {
+            perror("fork");
+            return 1;
+        }
+        close(fds[1]);
+        struct child_report report;
+        int status;
+        struct pollfd reply = {fds[0], POLLIN, 0};
+        if (poll(&reply, 1, CHILD_TIMEOUT_MS) <= 0) {
+            kill(pid, SIGKILL);
+            waitpid(pid, &status, 0);
+            fprintf(stderr, "child %zu timed out\n", i);
+            return 1;
+        }
+        ssize_t got = read(fds[0], &report, sizeof(report));
+        close(fds[0]);
+        waitpid(pid, &status, 0);
+        if (got != sizeof(report) || !WIFEXITED(status) || WEXITSTATUS(status) != 0) {
+            fprintf(stderr, "child %zu failed\n", i);
+            return 1;
+        }
+        fork_total += elapsed;
+        fork_max = elapsed > fork_max ? elapsed : fork_max;
+        start_total += report.start;
+        alloc_total += report.first_alloc;
+        alloc_max = report.first_alloc > alloc_max ? report.first_alloc : alloc_max;
+        fault_total += report.faults;
+    }
+    atomic_store(&stop, 1);
+    for (size_t i = 1; i < threads; ++i) {
+        pthread_join(workers[i].thread, NULL);
+    }
+    for (size_t i = 0; i < threads; ++i) {
+        for (size_t j = 0; j < workers[i].count; ++j) {
+            free(workers[i].blocks[j]);
+        }
+    }
+    printf("fork %.0f %llu\n", (double) fork_total / forks, (unsigned long long) fork_max);
+    printf("child_start %.0f\n", (double) start_total / forks);
+    printf("first_alloc %.0f %llu\n", (double) alloc_total / forks, (unsigned long long) alloc_max);
+    printf("child_faults %.1f\n", (double) fault_total / forks);
+    return 0;
+}
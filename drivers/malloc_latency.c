@@ -0,0 +1,186 @@
+/*
+ * Per-call latency of malloc and free.
+ *
+ * usage: malloc-latency <threads> <ops per thread> <min size> <max size>
+ *
+ * Every thread keeps a window of live blocks and repeatedly frees a random slot and
+ * refills it with a block of random size, timestamping each call. Samples go straight
+ * into a per-thread log-linear (HDR style) histogram that lives outside the allocator
+ * under test, so the hot loop does no I/O and no bookkeeping allocation. At exit the
+ * histograms are merged and one line per operation is printed, in nanoseconds:
+ *
+ *     malloc <p50> <p99> <p99.9> <max>
+ *     free <p50> <p99> <p99.9> <max>
+ */
+#define _GNU_SOURCE
+#include <pthread.h>
+#include <stdint.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <sys/mman.h>
+#include <time.h>
+#include "common.h"
+#if defined(__x86_64__) || defined(__i386__)
+#include <x86intrin.h>
+#endif
+
+#define SUB_BITS 5
+#define SUB (1 << SUB_BITS)
+#define BUCKETS ((64 - SUB_BITS + 1) * SUB)
+#define WINDOW 4096
+
+struct histogram {
+    uint64_t count[BUCKETS];
+    uint64_t max;
+    uint64_t total;
+};
+
+struct worker {
+    pthread_t thread;
+    uint64_t seed;
+    struct histogram malloc_hist;
+    struct histogram free_hist;
+    void *slots[WINDOW];
+};
+
+static size_t ops, min_size, max_size;
+static pthread_barrier_t barrier;
+static double ticks_per_ns = 1.0;
+
+#if defined(__x86_64__) || defined(__i386__)
+static inline uint64_t ticks(void) {
+    _mm_lfence();
+    return __rdtsc();
+}
+
+static void calibrate(void) {
+    struct timespec pause = {0, 100000000};
+    uint64_t t0 = ticks(), n0 = now_ns();
+    nanosleep(&pause, NULL);
+    uint64_t t1 = ticks(), n1 = now_ns();
+    ticks_per_ns = (double) (t1 - t0) / (double) (n1 - n0);
+}
+#else
+static inline uint64_t ticks(void) {
+    return now_ns();
+}
+
+static void calibrate(void) {}
+#endif
+
+static inline size_t bucket(uint64_t v) {
+    if (v < SUB) {
+        return v;
+    }
+    int e = 63 - __builtin_clzll(v);
+    return (size_t) (e - SUB_BITS + 1) * SUB + ((v >> (e - SUB_BITS)) & (SUB - 1));
+}
+
+/* highest value that falls into the bucket */
+static uint64_t bucket_value(size_t idx) {
+    if (idx < SUB) {
+        return idx;
+    }
+    int e = (int) (idx / SUB) + SUB_BITS - 1;
+    uint64_t base = (uint64_t) (SUB + idx % SUB) << (e - SUB_BITS);
+    return base + ((uint64_t) 1 << (e - SUB_BITS)) - 1;
+}
+
+static inline void record(struct histogram *h, uint64_t v) {
+    h->count[bucket(v)]++;
+    h->total++;
+    if (v > h->max) {
+        h->max = v;
+    }
+}
+
+static void *work(void *arg) {
+    struct worker *w = arg;
+    pthread_barrier_wait(&barrier);
+    for (size_t i = 0; i < ops; ++i) {
+        uint64_t r = next(&w->seed);
+        void **slot = &w->slots[r % WINDOW];
+        size_t size = min_size + (r >> 16) % (max_size - min_size + 1);
+        uint64_t t0, t1;
+        if (*slot) {
+            t0 = ticks();
+            free(*slot);
+            t1 = ticks();
+            record(&w->free_hist, t1 - t0);
+        }
+        t0 = ticks();
+        char *p = malloc(size);
+        t1 = ticks();
+        record(&w->malloc_hist, t1 - t0);
+        p[0] = 1;
+        *slot = p;
+    }
+    for (size_t i = 0; i < WINDOW; ++i) {
+        free(w->slots[i]);
+    }
+    return NULL;
+}
+
+static uint64_t percentile(const struct histogram *h, double q) {
+    uint64_t rank = (uint64_t) (q * (double) h->total), seen = 0;
+    for (size_t i = 0; i < BUCKETS; ++i) {
+        seen += h->count[i];
+        if (seen > rank) {
+            uint64_t v = bucket_value(i);
+            return v < h->max ? v : h->max;
+        }
+    }
+    return h->max;
+}
+
+static void report(const char *name, const struct histogram *h) {
+    printf("%s %.0f %.0f %.0f %.0f\n", name,
+           (double) percentile(h, 0.5) / ticks_per_ns,
+           (double) percentile(h, 0.99) / ticks_per_ns,
+           (double) percentile(h, 0.999) / ticks_per_ns,
+           (double) h->max / ticks_per_ns);
+}
+
+static void merge(struct histogram *to, const struct histogram *from) {
+    for (size_t i = 0; i < BUCKETS; ++i) {
+        to->count[i] += from->count[i];
+    }
+    to->total += from->total;
+    if (from->max > to->max) {
+        to->max = from->max;
+    }
+}
+
+int main(int argc, char **argv) {
+    if (argc != 5) {
+        fprintf(stderr, "usage: %s <threads> <ops per thread> <min size> <max size>\n", argv[0]);
+        return 1;
+    }
+    size_t threads = strtoull(argv[1], NULL, 10);
+    ops = strtoull(argv[2], NULL, 10);
+    min_size = strtoull(argv[3], NULL, 10);
+    max_size = strtoull(argv[4], NULL, 10);
+    if (threads == 0 || min_size == 0 || max_size < min_size) {
+        fprintf(stderr, "invalid arguments\n");
+        return 1;
+    }
+    calibrate();
+    size_t bytes = sizeof(struct worker) * (threads + 1);
+    struct worker *workers = map(bytes);
+    pthread_barrier_init(&barrier, NULL, (unsigned) threads);
+    for (size_t i = 0; i < threads; ++i) {
+        workers[i].seed = thread_seed(i);
+        pthread_create(&workers[i].thread, NULL, work, &workers[i]);
+    }
+    struct worker *total = &workers[threads];
+    for (size_t i = 0; i < threads; ++i) {
+        pthread_join(workers[i].thread, NULL);
+        merge(&total->malloc_hist, &workers[i].malloc_hist);
+        merge(&total->free_hist, &workers[i].free_hist);
+    }
+    report("malloc", &total->malloc_hist);
+    report("free", &total->free_hist);
+    munmap(workers, bytes);
+    return 0;
+}
@@ -0,0 +1,150 @@
+/*
+ * How fast memory goes back to the OS after a burst.
+ *
+ * usage: memory-decay <burst MiB> <min size> <max size> <idle seconds> <reuse percent> <threshold percent>
+ *
+ * Phases: allocate and touch a burst of blocks of random size, free all of them, stay
+ * idle while sampling RSS every 100 ms, then allocate <reuse percent> of the burst again.
+ * The decay threshold is baseline + <threshold percent> of (peak - baseline).
+ *
+ * madvise and munmap are defined here and exported (link with -rdynamic), so calls the
+ * preloaded allocator makes through the dynamic linker are counted before being passed
+ * to the kernel. Calls glibc makes internally, e.g. from its own malloc, bypass this.
+ *
+ * Output, RSS in KiB and times in seconds:
+ *
+ *     baseline_rss <KiB>
+ *     peak_rss <KiB>
+ *     after_free_rss <KiB>
+ *     retained_rss <KiB>           at the end of the idle phase
+ *     decay_time <s> <reached>     reached is 0 when RSS never fell below the threshold
+ *     reuse_faults <count>         minor page faults during the reuse burst
+ *     madvise <count>
+ *     munmap <count>
+ */
+#define _GNU_SOURCE
+#include <fcntl.h>
+#include <stdatomic.h>
+#include <stdint.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <sys/mman.h>
+#include <sys/syscall.h>
+#include <time.h>
+#include <unistd.h>
+#include "common.h"
+
+static atomic_ulong madvise_calls, munmap_calls;
+
+int madvise(void *addr, size_t length, int advice) {
+    atomic_fetch_add_explicit(&madvise_calls, 1, memory_order_relaxed);
+    return (int) syscall(SYS_madvise, addr, length, advice);
+}
+
+int munmap(void *addr, size_t length) {
+    atomic_fetch_add_explicit(&munmap_calls, 1, memory_order_relaxed);
+    return (int) syscall(SYS_munmap, addr, length);
+}
+
+static double now(void) {
+    return (double) now_ns() / 1e9;
+}
+
+/* resident set size in KiB, read without allocating */
+static long rss(void) {
+    char buf[128];
+    int fd = open("/proc/self/statm", O_RDONLY);
+    if (fd < 0) {
+        return 0;
+    }
+    ssize_t len = read(fd, buf, sizeof(buf) - 1);
+    close(fd);
+    if (len <= 0) {
+        return 0;
+    }
+    buf[len] = 0;
+    char *resident;
+    strtol(buf, &resident, 10);
+    return strtol(resident, NULL, 10) * (sysconf(_SC_PAGESIZE) / 1024);
+}
+
+static size_t burst(void **blocks, size_t capacity, size_t bytes, size_t min_size, size_t max_size, uint64_t *seed) {
+    size_t count = 0, filled = 0;
+    while (filled < bytes && count < capacity) {
+        size_t size = min_size + next(seed) % (max_size - min_size + 1);
+        blocks[count] = malloc(size);
+        memset(blocks[count], 1, size);
+        filled += size;
+        count++;
+    }
+    return count;
+}
+
+int main(int argc, char **argv) {
+    if (argc != 7) {
+        fprintf(stderr, "usage: %s <burst MiB> <min size> <max size> <idle seconds> <reuse percent> "
+                        "<threshold percent>\n", argv[0]);
+        return 1;
+    }
+    size_t bytes = strtoull(argv[1], NULL, 10) << 20;
+    size_t min_size = strtoull(argv[2], NULL, 10);
+    size_t max_size = strtoull(argv[3], NULL, 10);
+    double idle = strtod(argv[4], NULL);
+    size_t reuse = strtoull(argv[5], NULL, 10);
+    double threshold = strtod(argv[6], NULL) / 100.0;
+    if (min_size == 0 || max_size < min_size) {
+        fprintf(stderr, "invalid arguments\n");
+        return 1;
+    }
+    size_t capacity = bytes / min_size + 1;
+    void **blocks = map(sizeof(void *) * capacity);
+    uint64_t seed = SEED;
+    long baseline = rss();
+    atomic_store(&madvise_calls, 0);
+    atomic_store(&munmap_calls, 0);
+
+    size_t count = burst(blocks, capacity, bytes, min_size, max_size, &seed);
+    long peak = rss();
+    for (size_t i = 0; i < count; ++i) {
+        free(blocks[i]);
+    }
+    long after_free = rss();
+
+    long target = baseline + (long) (threshold * (double) (peak - baseline));
+    double start = now(), decay = idle;
+    int reached = 0;
+    struct timespec pause = {0, 100000000};
+    long current = after_free;
+    if (current <= target) {
+        decay = 0;
+        reached = 1;
+    }
+    while (now() - start < idle) {
+        nanosleep(&pause, NULL);
+        current = rss();
+        if (!reached && current <= target) {
+            decay = now() - start;
+            reached = 1;
+        }
+    }
+    long retained = current;
+
+    long faults = minor_faults();
+    count = burst(blocks, capacity, bytes / 100 * reuse, min_size, max_size, &seed);
+    long reuse_faults = minor_faults() - faults;
+    for (size_t i = 0; i < count; ++i) {
+        free(blocks[i]);
+    }
+    unsigned long madvised = atomic_load(&madvise_calls), unmapped = atomic_load(&munmap_calls);
+
+    printf("baseline_rss %ld\n", baseline);
+    printf("peak_rss %ld\n", peak);
+    printf("after_free_rss %ld\n", after_free);
+    printf("retained_rss %ld\n", retained);
+    printf("decay_time %.1f %d\n", decay, reached);
+    printf("reuse_faults %ld\n", reuse_faults);
+    printf("madvise %lu\n", madvised);
+    printf("munmap %lu\n", unmapped);
+    return 0;
+}
@@ -0,0 +1,45 @@
+"""An asyncio echo-style server driven by many concurrent client tasks over loopback."""
+import asyncio
+import sys
+import time
+
+
+async def handle(reader, writer):
+    while True:
+        line = await reader.readline()
+        if not line:
+            break
+        request = line.decode().split()
+        writer.write(" ".join(reversed(request)).encode() + b"\n")
+        await writer.drain()
+    writer.close()
+
+
+async def client(port, requests):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    for i in range(requests):
+        writer.write("GET /item/{} {}\n".format(i, "x" * (i % 64)).encode())
+        await writer.drain()
+        await reader.readline()
+    writer.close()
+    await writer.wait_closed()
+
+
+async def run(clients, requests):
+    server = await asyncio.start_server(handle, "127.0.0.1", 0, backlog=clients)
+    port = server.sockets[0].getsockname()[1]
+    start = time.perf_counter()
+    await asyncio.gather(*(client(port, requests) for _ in range(clients)))
+    elapsed = time.perf_counter() - start
+    server.close()
+    await server.wait_closed()
+    return elapsed
+
+
+def main(clients=500, requests=200):
+    elapsed = asyncio.run(run(clients, requests))
+    print(clients * requests, elapsed)
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,37 @@
+"""Dict and small-object churn: build, mutate and drop generations of objects."""
+import random
+import sys
+import time
+
+
+class Node:
+    __slots__ = ("key", "value", "children")
+
+    def __init__(self, key, value):
+        self.key = key
+        self.value = value
+        self.children = []
+
+
+def main(generations=40, size=50000):
+    rng = random.Random(0x1145_14ab)
+    ops = 0
+    start = time.perf_counter()
+    survivors = []
+    for _ in range(generations):
+        table = {}
+        for i in range(size):
+            node = Node(i, {"id": i, "name": "n{}".format(i), "tags": [rng.random() for _ in range(4)]})
+            table[node.value["name"]] = node
+            if i and i % 7 == 0:
+                table["n{}".format(i - 1)].children.append(node)
+        for i in range(0, size, 3):
+            del table["n{}".format(i)]
+        survivors = list(table.values())[:size // 10] + survivors[:size // 10]
+        ops += size
+    elapsed = time.perf_counter() - start
+    print(ops, elapsed)
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
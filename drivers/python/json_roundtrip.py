@@ -0,0 +1,32 @@
+"""Encode and decode a large JSON document repeatedly."""
+import json
+import random
+import sys
+import time
+
+
+def document(records):
+    rng = random.Random(0x1145_14ab)
+    return {
+        "version": 1,
+        "records": [{
+            "id": i,
+            "name": "record-{}".format(i),
+            "score": rng.random(),
+            "tags": ["t{}".format(rng.randrange(100)) for _ in range(rng.randrange(1, 8))],
+            "nested": {"a": [rng.randrange(1000) for _ in range(5)], "b": {"flag": i % 2 == 0}},
+        } for i in range(records)],
+    }
+
+
+def main(iterations=10, records=50000):
+    doc = document(records)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        doc = json.loads(json.dumps(doc))
+    elapsed = time.perf_counter() - start
+    print(iterations * records, elapsed)
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,28 @@
+"""Bulk insert into an in-memory sqlite3 database, then index and query it."""
+import random
+import sqlite3
+import sys
+import time
+
+
+def main(rows=500000, queries=2000):
+    rng = random.Random(0x1145_14ab)
+    data = [(i, "user{}".format(rng.randrange(rows)), rng.random() * 1000, "x" * rng.randrange(8, 128))
+            for i in range(rows)]
+    start = time.perf_counter()
+    db = sqlite3.connect(":memory:")
+    db.execute("CREATE TABLE events (id INTEGER PRIMARY KEY, user TEXT, amount REAL, payload TEXT)")
+    db.executemany("INSERT INTO events VALUES (?, ?, ?, ?)", data)
+    db.commit()
+    db.execute("CREATE INDEX events_user ON events (user)")
+    for _ in range(queries):
+        user = "user{}".format(rng.randrange(rows))
+        db.execute("SELECT count(*), sum(amount) FROM events WHERE user = ?", (user,)).fetchall()
+    db.execute("SELECT user, count(*), avg(amount) FROM events GROUP BY user ORDER BY 2 DESC LIMIT 100").fetchall()
+    db.close()
+    elapsed = time.perf_counter() - start
+    print(rows + queries, elapsed)
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
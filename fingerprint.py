@@ -0,0 +1,109 @@
+import functools
+import json
+import os
+import subprocess
+
+CACHE_DIR = ".bench_cache"
+CACHE_FILE = os.path.join(CACHE_DIR, "fingerprint.json")
+TOOLS = ("ruby", "agda", "z3", "redis-server")
+LIBC = "/lib64/libc.so.6"
+
+
+def submodules():
+    with open(".gitmodules") as file:
+        return [line.split("=", 1)[1].strip() for line in file if line.strip().startswith("path")]
+
+
+def submodule_head(path: str) -> str:
+    """Resolve the HEAD commit of a submodule by reading its git dir, without spawning git."""
+    try:
+        gitdir = os.path.join(path, ".git")
+        if os.path.isfile(gitdir):
+            with open(gitdir) as file:
+                gitdir = os.path.join(path, file.read().split(":", 1)[1].strip())
+        with open(os.path.join(gitdir, "HEAD")) as file:
+            head = file.read().strip()
+        if not head.startswith("ref:"):
+            return head
+        ref = head.split(":", 1)[1].strip()
+        if os.path.exists(os.path.join(gitdir, ref)):
+            with open(os.path.join(gitdir, ref)) as file:
+                return file.read().strip()
+        with open(os.path.join(gitdir, "packed-refs")) as file:
+            for line in file:
+                if line.rstrip().endswith(" " + ref):
+                    return line.split()[0]
+    except (OSError, IndexError):
+        pass
+    return "unknown"
+
+
+def cache_key() -> str:
+    import hashlib, platform, shutil
+    import builder
+    digest = hashlib.sha256()
+    for path in submodules():
+        digest.update("{}={}\n".format(path, submodule_head(path)).encode())
+    digest.update(" ".join(platform.uname()).encode())
+    # allocators sharing a submodule, like the secure variants, only differ here
+    for name in sorted(builder.builder_list):
+        b = builder.builder_list[name]
+        digest.update("{}:{}:{}\n".format(name, getattr(b, "workdir", None), b.crate_version).encode())
+    for found in [shutil.which(i) for i in TOOLS] + [LIBC]:
+        if found and os.path.exists(found):
+            stat = os.stat(found)
+            digest.update("{}:{}:{}\n".format(found, stat.st_mtime_ns, stat.st_size).encode())
+    return digest.hexdigest()
+
+
+def get_cpu_info():
+    with open("/proc/cpuinfo") as file:
+        for line in file:
+            if line.startswith("model name"):
+                return line.split(":", 1)[1].strip()
+
+
+def tool_version(tool: str) -> str:
+    try:
+        return subprocess.run([tool, "--version"], capture_output=True).stdout.decode().strip()
+    except FileNotFoundError:
+        return "not found"
+
+
+def allocator_version(b) -> str:
+    try:
+        return b.version()
+    except (OSError, IndexError):
+        return "unknown"
+
+
+def collect():
+    import concurrent.futures
+    import builder
+    with concurrent.futures.ThreadPoolExecutor() as pool:
+        cpu = pool.submit(get_cpu_info)
+        tools = {i: pool.submit(tool_version, i) for i in TOOLS}
+        allocators = {k: pool.submit(allocator_version, v) for k, v in builder.builder_list.items()}
+        return {
+            "cpu": cpu.result(),
+            "tools": {k: v.result() for k, v in tools.items()},
+            "allocators": {k: v.result() for k, v in allocators.items()},
+        }
+
+
+@functools.lru_cache(maxsize=None)
+def fingerprint():
+    """Host and allocator versions, cached on disk until a submodule HEAD or a tool binary changes."""
+    key = cache_key()
+    try:
+        with open(CACHE_FILE) as file:
+            cached = json.load(file)
+        if cached["key"] == key:
+            return cached["data"]
+    except (OSError, ValueError, KeyError):
+        pass
+    data = collect()
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    with open(CACHE_FILE, "w+") as file:
+        json.dump({"key": key, "data": data}, file)
+    return data
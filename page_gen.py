@@ -1,4 +1,3 @@
-import subprocess
 import bencher
 
 MATRIX_TEMPLATE = """
@@ -30,52 +29,29 @@ ALLOCATOR_TEMPLATE = """
 """
 
 
-def get_cpu_info():
-    import re
-    command = "cat /proc/cpuinfo"
-    all_info = subprocess.check_output(command, shell=True).strip()
-    for line in all_info.split(b"\n"):
-        if b"model name" in line:
-            return re.sub(".*model name.*:", "", line.decode(), 1).strip()
-
-
-def gen_allocators():
+def gen_allocators(versions):
     import builder
     res = []
-    for i in builder.builder_list.values():
-        res.append(ALLOCATOR_TEMPLATE.format(i.name, i.version(), i.size()))
+    for k, i in builder.builder_list.items():
+        res.append(ALLOCATOR_TEMPLATE.format(i.name, versions[k], i.size()))
     return "".join(res)
 
 
-def ruby_version():
-    return subprocess.run(["ruby", "--version"], capture_output=True).stdout.decode().strip()
-
-
-def agda_version():
-    return subprocess.run(["agda", "--version"], capture_output=True).stdout.decode().strip()
-
-
-def z3_version():
-    return subprocess.run(["z3", "--version"], capture_output=True).stdout.decode().strip()
-
-
-def redis_version():
-    return subprocess.run(["redis-server", "--version"], capture_output=True).stdout.decode().strip()
-
-
 def gen_matrix():
     import platform, multiprocessing
+    import fingerprint
+    info = fingerprint.fingerprint()
     uname = platform.uname()
     return MATRIX_TEMPLATE.format(
         multiprocessing.cpu_count(),
-        get_cpu_info(),
+        info["cpu"],
         uname.release,
         uname.version,
-        redis_version(),
-        agda_version(),
-        ruby_version(),
-        z3_version(),
-        gen_allocators()
+        info["tools"]["redis-server"],
+        info["tools"]["agda"],
+        info["tools"]["ruby"],
+        info["tools"]["z3"],
+        gen_allocators(info["allocators"])
     )
 
 
@@ -115,6 +91,11 @@ def gen_page(b):
         res.append(
             PICTURE_TEMPLATE.format(b.__name__, i, b.__name__, i)
         )
+    for i in getattr(b, "latency_ops", ()):
+        name = "{}_percentiles".format(i)
+        res.append(
+            PICTURE_TEMPLATE.format(b.__name__, name, b.__name__, name)
+        )
     return PAGE_TEMPLATE.format(b.__name__, b.__name__, "".join(res))
 
 
@@ -0,0 +1,100 @@
+import json
+from time import monotonic
+import auto_bench
+import bencher
+import builder
+import telemetry
+
+DEFAULT_ROUND = 60.0  # seconds assumed per round of a cell whose bencher no run has recorded yet
+UNITS = {"s": 1, "m": 60, "h": 3600}
+
+
+def parse_duration(value) -> float:
+    """Seconds from a number or a string such as '90m' or '1.5h'."""
+    if isinstance(value, str) and value[-1:] in UNITS:
+        return float(value[:-1]) * UNITS[value[-1]]
+    return float(value)
+
+
+def estimate(b, alloc) -> float:
+    # other benchers' rounds say nothing about this one, so never borrow their median
+    predicted = telemetry.current.predict(telemetry.cell_name(b, alloc), 1, any_cell=False)
+    return DEFAULT_ROUND if predicted is None else predicted
+
+
+def plan(budget, benchers=None, allocators=None, min_rounds=3, max_rounds=10):
+    """
+    Choose which bencher/allocator cells and how many rounds fit into `budget` seconds.
+    Benchers and allocators are given in priority order. Every scheduled bencher gets at
+    least two allocators with `min_rounds` rounds each so that it yields a comparison;
+    leftover time adds rounds to the highest priority benchers first.
+    """
+    benchers = list(benchers or bencher.bencher_list.keys())
+    allocators = list(allocators or builder.builder_list.keys())
+    for name in benchers:
+        if name not in bencher.bencher_list:
+            raise ValueError("unknown bencher {}".format(name))
+    for key in allocators:
+        if key not in builder.builder_list:
+            raise ValueError("unknown allocator {}".format(key))
+    left = budget
+    groups = []
+    skipped = []
+    for name in benchers:
+        b = bencher.bencher_list[name]
+        group = []
+        for key in allocators:
+            alloc = builder.builder_list[key]
+            if not auto_bench.applicable(b, alloc):
+                continue
+            cost = estimate(b, alloc)
+            if cost * min_rounds <= left:
+                group.append({"bencher": name, "allocator": key, "rounds": min_rounds, "round": cost})
+                left -= cost * min_rounds
+            else:
+                skipped.append("{}/{}".format(name, key))
+        if len(group) < 2:
+            left += sum(i["round"] * i["rounds"] for i in group)
+            skipped += ["{}/{}".format(i["bencher"], i["allocator"]) for i in group]
+        else:
+            groups.append(group)
+    for _ in range(min_rounds, max_rounds):
+        for group in groups:
+            cost = sum(i["round"] for i in group)
+            if cost <= left:
+                left -= cost
+                for i in group:
+                    i["rounds"] += 1
+    cells = []
+    for rank, group in enumerate(groups):
+        for i in sorted(group, key=lambda x: x["round"] * x["rounds"]):
+            cells.append(dict(i, estimate=i["round"] * i["rounds"], rank=rank))
+    cells.sort(key=lambda x: (x["rank"], x["estimate"]))
+    return {"budget": budget, "estimate": budget - left, "cells": cells, "skipped": skipped}
+
+
+def run_plan(p, vis=True, save="output/plan.json"):
+    """Run a plan, skipping cells predicted to overrun its budget; results are saved after every cell."""
+    deadline = monotonic() + p["budget"]
+    res = {"results": {}, "not_run": list(p["skipped"])}
+    progress = telemetry.current
+    began = progress.begin([telemetry.cell_name(bencher.bencher_list[i["bencher"]], builder.builder_list[i["allocator"]])
+                            for i in p["cells"]], [i["rounds"] for i in p["cells"]])
+    for i in p["cells"]:
+        b = bencher.bencher_list[i["bencher"]]
+        alloc = builder.builder_list[i["allocator"]]
+        if estimate(b, alloc) * i["rounds"] > deadline - monotonic():
+            res["not_run"].append("{}/{}".format(i["bencher"], i["allocator"]))
+            continue
+        print("running", b.__name__, "with", alloc.name)
+        single = auto_bench.auto_run_single(b, alloc, i["rounds"], True)
+        res["results"].setdefault(i["bencher"], {})[alloc.name] = single
+        if save:
+            with open(save, "w+") as file:
+                file.write(json.dumps(res))
+    if began:
+        progress.finish()
+    if vis:
+        for name, data in res["results"].items():
+            auto_bench.visualize(bencher.bencher_list[name], data)
+    return res
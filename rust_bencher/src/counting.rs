@@ -0,0 +1,124 @@
+//! A `GlobalAlloc` wrapper counting the traffic that reaches the allocator under test.
+//!
+//! Every thread owns a cache-line sized slot of counters, so counting never contends.
+//! Live bytes are accumulated in a thread-local delta that is only folded into the shared
+//! total (and the peak) once it exceeds `FLUSH` bytes, which keeps the peak accurate to
+//! within `FLUSH` bytes per thread.
+use std::alloc::{GlobalAlloc, Layout};
+use std::cell::Cell;
+use std::sync::atomic::{AtomicI64, AtomicU64, AtomicUsize, Ordering::Relaxed};
+
+const SLOTS: usize = 256;
+const FLUSH: i64 = 64 * 1024;
+
+#[repr(align(64))]
+struct Slot {
+    allocs: AtomicU64,
+    frees: AtomicU64,
+    reallocs: AtomicU64,
+    bytes: AtomicU64,
+}
+
+#[allow(clippy::declare_interior_mutable_const)]
+const EMPTY: Slot = Slot {
+    allocs: AtomicU64::new(0),
+    frees: AtomicU64::new(0),
+    reallocs: AtomicU64::new(0),
+    bytes: AtomicU64::new(0),
+};
+
+static COUNTERS: [Slot; SLOTS] = [EMPTY; SLOTS];
+static THREADS: AtomicUsize = AtomicUsize::new(0);
+static LIVE: AtomicI64 = AtomicI64::new(0);
+static PEAK: AtomicI64 = AtomicI64::new(0);
+
+#[thread_local]
+static SLOT: Cell<usize> = Cell::new(usize::MAX);
+#[thread_local]
+static DELTA: Cell<i64> = Cell::new(0);
+
+/// threads beyond the number of slots share the last one
+fn slot() -> &'static Slot {
+    let mut index = SLOT.get();
+    if index == usize::MAX {
+        index = THREADS.fetch_add(1, Relaxed).min(SLOTS - 1);
+        SLOT.set(index);
+    }
+    &COUNTERS[index]
+}
+
+fn flush(delta: i64) {
+    let live = LIVE.fetch_add(delta, Relaxed) + delta;
+    PEAK.fetch_max(live, Relaxed);
+}
+
+fn track(change: i64) {
+    let delta = DELTA.get() + change;
+    if delta.abs() >= FLUSH {
+        flush(delta);
+        DELTA.set(0);
+    } else {
+        DELTA.set(delta);
+    }
+}
+
+fn count_alloc(size: usize) {
+    let slot = slot();
+    slot.allocs.fetch_add(1, Relaxed);
+    slot.bytes.fetch_add(size as u64, Relaxed);
+    track(size as i64);
+}
+
+pub struct Counting<A>(pub A);
+
+unsafe impl<A: GlobalAlloc> GlobalAlloc for Counting<A> {
+    unsafe fn alloc(&self, layout: Layout) -> *mut u8 {
+        count_alloc(layout.size());
+        self.0.alloc(layout)
+    }
+
+    unsafe fn dealloc(&self, ptr: *mut u8, layout: Layout) {
+        slot().frees.fetch_add(1, Relaxed);
+        track(-(layout.size() as i64));
+        self.0.dealloc(ptr, layout)
+    }
+
+    unsafe fn alloc_zeroed(&self, layout: Layout) -> *mut u8 {
+        count_alloc(layout.size());
+        self.0.alloc_zeroed(layout)
+    }
+
+    unsafe fn realloc(&self, ptr: *mut u8, layout: Layout, new_size: usize) -> *mut u8 {
+        let slot = slot();
+        slot.reallocs.fetch_add(1, Relaxed);
+        slot.bytes.fetch_add(new_size as u64, Relaxed);
+        track(new_size as i64 - layout.size() as i64);
+        self.0.realloc(ptr, layout, new_size)
+    }
+}
+
+/// Print the counters as a single `alloc-stats <json>` line on stderr, leaving stdout to the
+/// benchmark output.
+pub fn report() {
+    flush(DELTA.replace(0));
+    let threads = THREADS.load(Relaxed).min(SLOTS);
+    let (mut allocs, mut frees, mut reallocs, mut bytes) = (0, 0, 0, 0);
+    let mut per_thread = [0u64; SLOTS];
+    for (i, slot) in COUNTERS[..threads].iter().enumerate() {
+        per_thread[i] = slot.allocs.load(Relaxed);
+        allocs += per_thread[i];
+        frees += slot.frees.load(Relaxed);
+        reallocs += slot.reallocs.load(Relaxed);
+        bytes += slot.bytes.load(Relaxed);
+    }
+    let per_thread: Vec<String> = per_thread[..threads].iter().map(u64::to_string).collect();
+    eprintln!(
+        "alloc-stats {{\"allocs\": {}, \"frees\": {}, \"reallocs\": {}, \"bytes\": {}, \"peak_live\": {}, \"thread_allocs\": [{}]}}",
+        allocs,
+        frees,
+        reallocs,
+        bytes,
+        PEAK.load(Relaxed).max(0),
+        per_thread.join(", ")
+    );
+}
@@ -1,5 +1,6 @@
 #![feature(core_intrinsics)]
 #![feature(type_ascription)]
+#![feature(thread_local)]
 use std::collections::BTreeSet;
 use xactor::*;
 use exec_time::*;
@@ -8,33 +9,44 @@ use structopt::*;
 use std::sync::Arc;
 use crossbeam_skiplist::SkipSet;
 
+#[cfg(feature = "count_alloc")]
+mod counting;
+
+/// Install an allocator as the global one, wrapped in the counting layer when `count_alloc` is on.
+macro_rules! global_allocator {
+    ($ty:ty, $init:expr) => {
+        #[cfg(not(feature = "count_alloc"))]
+        #[global_allocator]
+        static GLOBAL: $ty = $init;
+        #[cfg(feature = "count_alloc")]
+        #[global_allocator]
+        static GLOBAL: counting::Counting<$ty> = counting::Counting($init);
+    };
+}
+
 #[cfg(feature = "bench_rpmalloc")]
-#[global_allocator]
-static GLOBAL: rpmalloc::RpMalloc = rpmalloc::RpMalloc;
+global_allocator!(rpmalloc::RpMalloc, rpmalloc::RpMalloc);
 
-#[cfg(any(feature = "bench_mimalloc", feature = "bench_smimalloc-secure"))]
-#[global_allocator]
-static GLOBAL: mimalloc::MiMalloc = mimalloc::MiMalloc;
+#[cfg(any(feature = "bench_mimalloc", feature = "bench_mimalloc-secure"))]
+global_allocator!(mimalloc::MiMalloc, mimalloc::MiMalloc);
 
 #[cfg(feature = "bench_jemalloc")]
-#[global_allocator]
-static GLOBAL: jemallocator::Jemalloc = jemallocator::Jemalloc;
+global_allocator!(jemallocator::Jemalloc, jemallocator::Jemalloc);
 
 #[cfg(feature = "bench_weealloc")]
-#[global_allocator]
-static GLOBAL: wee_alloc::WeeAlloc = wee_alloc::WeeAlloc::INIT;
+global_allocator!(wee_alloc::WeeAlloc, wee_alloc::WeeAlloc::INIT);
 
 #[cfg(feature = "bench_tcmalloc")]
-#[global_allocator]
-static GLOBAL: tcmalloc::TCMalloc = tcmalloc::TCMalloc;
+global_allocator!(tcmalloc::TCMalloc, tcmalloc::TCMalloc);
 
 #[cfg(any(feature = "bench_snmalloc", feature = "bench_snmalloc-1mib"))]
-#[global_allocator]
-static GLOBAL: snmalloc_rs::SnMalloc = snmalloc_rs::SnMalloc;
+global_allocator!(snmalloc_rs::SnMalloc, snmalloc_rs::SnMalloc);
 
 #[cfg(feature = "bench_dlmalloc")]
-#[global_allocator]
-static GLOBAL: dlmalloc::GlobalDlmalloc = dlmalloc::GlobalDlmalloc;
+global_allocator!(dlmalloc::GlobalDlmalloc, dlmalloc::GlobalDlmalloc);
+
+#[cfg(all(feature = "bench_system", feature = "count_alloc"))]
+global_allocator!(std::alloc::System, std::alloc::System);
 
 const SEED: u64 = 0xffff_1145_14ab_cdef;
 
@@ -228,5 +240,7 @@ async fn main() -> Result<()> {
             println!("{}", result);
         }
     };
+    #[cfg(feature = "count_alloc")]
+    counting::report();
     Ok(())
 }
\ No newline at end of file
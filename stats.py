@@ -0,0 +1,45 @@
+import math
+from typing import *
+
+# two-sided 95% critical values of Student's t distribution, indexed by degrees of freedom
+T_95 = (12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+        2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+        2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042)
+
+
+def t_critical(df: int) -> float:
+    if df <= len(T_95):
+        return T_95[df - 1]
+    if df <= 60:
+        return 2.000
+    if df <= 120:
+        return 1.980
+    return 1.960
+
+
+def mean(data: Sequence[float]) -> float:
+    return sum(data) / len(data)
+
+
+def mean_ci(data: Sequence[float]) -> Tuple[float, Optional[float]]:
+    """Sample mean and the half width of its 95% confidence interval (None below two samples)."""
+    ave = mean(data)
+    if len(data) < 2:
+        return ave, None
+    var = sum((x - ave) ** 2 for x in data) / (len(data) - 1)
+    return ave, t_critical(len(data) - 1) * math.sqrt(var / len(data))
+
+
+def paired(base: Sequence[float], other: Sequence[float]):
+    """Compare paired samples of two variants: mean difference (other - base) with a 95% interval."""
+    diff, half = mean_ci([b - a for a, b in zip(base, other)])
+    base_mean = mean(base)
+    res = {"base": base_mean, "other": mean(other), "diff": diff, "ci": None,
+           "rel": None, "rel_ci": None}
+    if half is not None:
+        res["ci"] = [diff - half, diff + half]
+    if base_mean:
+        res["rel"] = diff / base_mean * 100
+        if half is not None:
+            res["rel_ci"] = [i / base_mean * 100 for i in res["ci"]]
+    return res
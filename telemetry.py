@@ -0,0 +1,238 @@
+import json
+import os
+import threading
+import time
+import fingerprint
+
+HISTORY_FILE = os.path.join(fingerprint.CACHE_DIR, "durations.json")
+HISTORY_SIZE = 10
+
+
+def cell_name(bencher, builder) -> str:
+    return "{}/{}".format(bencher.__name__, builder.name)
+
+
+def load_history():
+    try:
+        with open(HISTORY_FILE) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+
+def open_stream(target: str):
+    """A line-buffered text stream for a file path, tcp://host:port or unix:///path."""
+    import socket
+    if target.startswith("tcp://"):
+        host, port = target[len("tcp://"):].rsplit(":", 1)
+        return socket.create_connection((host, int(port))).makefile("w", buffering=1)
+    if target.startswith("unix://"):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(target[len("unix://"):])
+        return sock.makefile("w", buffering=1)
+    return open(target, "a", buffering=1)
+
+
+class Telemetry:
+    """
+    Progress of a benchmark run: emits JSON-lines events to the configured streams, serves
+    Prometheus metrics on demand and predicts the remaining time from per-round durations
+    recorded by earlier runs.
+    """
+
+    def __init__(self):
+        # guards the run state read by the metrics server thread; reentrant since the
+        # locked methods emit, and emit reads the ETA under the same lock
+        self.lock = threading.RLock()
+        self.streams = []
+        self.server = None
+        self._history = None
+        self.reset()
+
+    @property
+    def history(self):
+        if self._history is None:
+            self._history = load_history()
+        return self._history
+
+    def reset(self):
+        self.running = False
+        self.start = None
+        self.planned = []
+        self.done = {}
+        self.failed = []
+        self.cell = None
+        self.cell_start = None
+        self.round = None
+
+    def add_stream(self, target: str):
+        self.streams.append(open_stream(target))
+
+    def serve(self, port: int, host="127.0.0.1"):
+        import http.server
+        telemetry = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == "/metrics":
+                    body, kind = telemetry.metrics(), "text/plain; version=0.0.4"
+                elif self.path == "/status":
+                    body, kind = json.dumps(telemetry.status()), "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", kind)
+                self.end_headers()
+                self.wfile.write(body.encode())
+
+            def log_message(self, *args):
+                pass
+
+        self.server = http.server.ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def emit(self, event: str, **fields):
+        record = {"event": event, "time": time.time(), **fields}
+        with self.lock:
+            if self.running:
+                record["elapsed"] = time.monotonic() - self.start
+                record["eta"] = self.eta()
+            line = json.dumps(record) + "\n"
+            for i in self.streams:
+                try:
+                    i.write(line)
+                except OSError:
+                    pass
+
+    def predict(self, cell: str, rounds: int, any_cell=True):
+        """
+        Predicted seconds for `rounds` rounds of a cell, falling back to its bencher, then,
+        unless `any_cell` is false, to any cell.
+        """
+        samples = self.history.get(cell)
+        if not samples:
+            bencher = cell.split("/")[0] + "/"
+            samples = [j for k, v in self.history.items() if k.startswith(bencher) for j in v]
+        if not samples and any_cell:
+            samples = [j for v in self.history.values() for j in v]
+        if not samples:
+            return None
+        import statistics
+        return statistics.median(samples) * rounds
+
+    def eta(self):
+        res = 0.0
+        for cell, rounds in self.planned:
+            if cell in self.done or cell in self.failed:
+                continue
+            predicted = self.predict(cell, rounds)
+            if predicted is None:
+                return None
+            if cell == self.cell:
+                predicted = max(predicted - (time.monotonic() - self.cell_start), 0.0)
+            res += predicted
+        return res
+
+    def begin(self, cells, rounds) -> bool:
+        """
+        Start tracking a run over `cells`, with `rounds` given once for all cells or per cell.
+        Nested calls join the outer run and return False.
+        """
+        if isinstance(rounds, int):
+            rounds = [rounds] * len(cells)
+        with self.lock:
+            if self.running:
+                return False
+            self.reset()
+            self.running = True
+            self.start = time.monotonic()
+            self.planned = list(zip(cells, rounds))
+            self.emit("run_start", cells=list(cells), rounds=list(rounds))
+        return True
+
+    def finish(self):
+        with self.lock:
+            self.emit("run_end", done=len(self.done), failed=list(self.failed))
+            self.reset()
+
+    def start_cell(self, cell: str, rounds: int):
+        with self.lock:
+            self.cell = cell
+            self.cell_start = time.monotonic()
+            if cell not in (i for i, _ in self.planned):
+                self.planned.append((cell, rounds))
+            self.emit("cell_start", cell=cell, rounds=rounds)
+
+    def start_round(self, index: int):
+        with self.lock:
+            self.round = index
+            self.emit("round_start", cell=self.cell, round=index)
+
+    def end_round(self, index: int, duration: float):
+        with self.lock:
+            samples = self.history.setdefault(self.cell, [])
+            samples.append(duration)
+            del samples[:-HISTORY_SIZE]
+            self.emit("round_end", cell=self.cell, round=index, duration=duration)
+
+    def end_cell(self, error=None):
+        with self.lock:
+            duration = time.monotonic() - self.cell_start
+            if error is None:
+                self.done[self.cell] = duration
+            else:
+                self.failed.append(self.cell)
+            self.emit("cell_end", cell=self.cell, duration=duration, ok=error is None, error=error)
+            self.cell = None
+            self.cell_start = None
+            self.round = None
+            history = json.dumps(self.history)
+        os.makedirs(fingerprint.CACHE_DIR, exist_ok=True)
+        with open(HISTORY_FILE, "w+") as file:
+            file.write(history)
+
+    def status(self):
+        """A consistent snapshot of the run, safe to call from the metrics server thread."""
+        with self.lock:
+            return {
+                "running": self.running,
+                "elapsed": time.monotonic() - self.start if self.running else None,
+                "eta": self.eta() if self.running else None,
+                "cell": self.cell,
+                "round": self.round,
+                "planned": len(self.planned),
+                "done": dict(self.done),
+                "failed": list(self.failed),
+            }
+
+    def metrics(self) -> str:
+        status = self.status()
+        lines = [
+            "# TYPE bench_running gauge",
+            "bench_running {}".format(int(status["running"])),
+            "# TYPE bench_elapsed_seconds gauge",
+            "bench_elapsed_seconds {}".format(status["elapsed"] or 0),
+            "# TYPE bench_cells_planned gauge",
+            "bench_cells_planned {}".format(status["planned"]),
+            "# TYPE bench_cells_done gauge",
+            "bench_cells_done {}".format(len(status["done"])),
+            "# TYPE bench_cells_failed gauge",
+            "bench_cells_failed {}".format(len(status["failed"])),
+        ]
+        if status["eta"] is not None:
+            lines += ["# TYPE bench_eta_seconds gauge", "bench_eta_seconds {}".format(status["eta"])]
+        if status["cell"] is not None:
+            bencher, allocator = status["cell"].split("/", 1)
+            lines += ["# TYPE bench_current_round gauge",
+                      'bench_current_round{{bencher="{}",allocator="{}"}} {}'.format(
+                          bencher, allocator, status["round"] or 0)]
+        lines.append("# TYPE bench_cell_duration_seconds gauge")
+        for cell, duration in status["done"].items():
+            bencher, allocator = cell.split("/", 1)
+            lines.append('bench_cell_duration_seconds{{bencher="{}",allocator="{}"}} {}'.format(
+                bencher, allocator, duration))
+        return "\n".join(lines) + "\n"
+
+
+current = Telemetry()
@@ -0,0 +1,144 @@
+import collections
+import itertools
+import json
+import math
+import auto_bench
+import bencher
+import builder
+import stats
+
+# Runtime and build knobs per allocator. A value of None leaves the knob at its default.
+#   env:         passed verbatim to the bencher environment
+#   malloc_conf: joined into jemalloc's MALLOC_CONF
+#   cmake:       -D options of a separately built variant
+knob_space = {
+    "mimalloc": {"env": {
+        "MIMALLOC_EAGER_COMMIT": (None, "0"),
+        "MIMALLOC_LARGE_OS_PAGES": (None, "1"),
+        "MIMALLOC_PAGE_RESET": (None, "0", "1"),
+        "MIMALLOC_RESET_DELAY": (None, "0", "1000"),
+    }},
+    "jemalloc": {"malloc_conf": {
+        "narenas": (None, "1", "4"),
+        "dirty_decay_ms": (None, "0", "1000", "30000"),
+        "muzzy_decay_ms": (None, "0"),
+        "background_thread": (None, "true"),
+    }},
+    "tcmalloc": {"env": {
+        "TCMALLOC_RELEASE_RATE": (None, "0", "10"),
+        "TCMALLOC_AGGRESSIVE_DECOMMIT": (None, "true"),
+        "TCMALLOC_MAX_TOTAL_THREAD_CACHE_BYTES": (None, "268435456"),
+    }},
+    "snmalloc": {"cmake": {
+        "CACHE_FRIENDLY_OFFSET": (None, "64"),
+    }},
+}
+
+
+def grid(space):
+    knobs = [(kind, name, values) for kind, group in space.items() for name, values in group.items()]
+    for choice in itertools.product(*(values for _, _, values in knobs)):
+        config = collections.defaultdict(dict)
+        for (kind, name, _), value in zip(knobs, choice):
+            if value is not None:
+                config[kind][name] = value
+        yield dict(config)
+
+
+def tag(config) -> str:
+    knobs = sorted("{}={}".format(k, v) for group in config.values() for k, v in group.items())
+    return ",".join(knobs) if knobs else "default"
+
+
+def variant(allocator: str, config):
+    """The builder and extra environment realizing one configuration of an allocator."""
+    b = builder.builder_list[allocator]
+    env = dict(config.get("env", {}))
+    if "malloc_conf" in config:
+        env["MALLOC_CONF"] = ",".join("{}:{}".format(k, v) for k, v in sorted(config["malloc_conf"].items()))
+    if "cmake" in config:
+        options = ["-D{}={}".format(k, v) for k, v in sorted(config["cmake"].items())]
+        b = builder.derive(b, "{}+{}".format(b.name, tag({"cmake": config["cmake"]})), options=b.options + options)
+        b.build()
+    return b, env
+
+
+def objective(b, metric=None):
+    """The attribute to optimize for a bencher and whether larger is better."""
+    if metric is None:
+        metric = "op_per_sec" if "op_per_sec" in b.attribute_list else "time_elapsed"
+    if metric not in b.attribute_list:
+        raise ValueError("{} does not report {}, choose a metric from {}".format(
+            b.__name__, metric, ", ".join(b.attribute_list)))
+    return metric, metric == "op_per_sec"
+
+
+def evaluate(b, allocator, config, samples, time):
+    alloc, env = variant(allocator, config)
+    for i in range(time):
+        print("-- round #{}".format(i))
+        runner = auto_bench.make_runner(b, alloc, env)
+        try:
+            runner.run()
+        except Exception as e:
+            print("Error during execution", e)
+            print("STDERR", runner.stderr)
+            print("CODE", runner.returncode)
+            return False
+        for attr in b.attribute_list:
+            samples[attr].append(runner[attr])
+    return True
+
+
+def tune_bencher(b, allocator, configs, time=3, search="grid", eta=2, metric=None):
+    metric, maximize = objective(b, metric)
+    samples = {tag(c): collections.defaultdict(list) for c in configs}
+    alive = list(configs)
+    rounds = time
+    while alive:
+        for c in alive:
+            print("running", b.__name__, "with", allocator, tag(c))
+            done = len(samples[tag(c)][metric])
+            if not evaluate(b, allocator, c, samples[tag(c)], rounds - done):
+                samples[tag(c)] = None
+        alive = [c for c in alive if samples[tag(c)] is not None]
+        alive.sort(key=lambda c: stats.mean(samples[tag(c)][metric]), reverse=maximize)
+        if search != "halving" or len(alive) <= 1:
+            break
+        alive = alive[:math.ceil(len(alive) / eta)]
+        rounds *= eta
+    configs = {tag(c): c for c in configs}
+    res = {"metric": metric, "best": tag(alive[0]) if alive else None, "configs": {}}
+    for name, s in samples.items():
+        res["configs"][name] = {
+            "config": configs[name],
+            "rounds": len(s[metric]) if s else 0,
+            "mean": {attr: stats.mean(v) for attr, v in s.items()} if s else None,
+        }
+    return res
+
+
+def tune(allocator: str, benchers, time=3, search="grid", eta=2, metric=None, save=True):
+    """Search the knob space of an allocator on each bencher with grid or successive-halving search."""
+    if allocator not in knob_space:
+        raise ValueError("no knob space declared for {}".format(allocator))
+    if search not in ("grid", "halving"):
+        raise ValueError("unknown search {}".format(search))
+    if eta < 2:
+        raise ValueError("eta must be at least 2")
+    if "cmake" in knob_space[allocator] and not isinstance(builder.builder_list[allocator], builder.CMAKEBuilder):
+        raise ValueError("{} is not a cmake project, its build knobs cannot be tuned".format(allocator))
+    for name in benchers:
+        if name not in bencher.bencher_list:
+            raise ValueError("unknown bencher {}".format(name))
+        if bencher.bencher_list[name].rust:
+            raise ValueError("{} links allocator crates and cannot be tuned".format(name))
+        objective(bencher.bencher_list[name], metric)
+    configs = list(grid(knob_space[allocator]))
+    res = dict()
+    for name in benchers:
+        res[name] = tune_bencher(bencher.bencher_list[name], allocator, configs, time, search, eta, metric)
+    if save:
+        with open("output/tuning-{}.json".format(allocator), "w+") as file:
+            file.write(json.dumps(res))
+    return res
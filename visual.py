@@ -41,3 +41,22 @@ def plot(bencher, data):
         fig.tight_layout()
         plt.savefig("output/{}-{}.png".format(bencher.__name__, i))
         plt.close(fig)
+
+
+def plot_percentiles(bencher, data):
+    percentiles = bencher.latency_percentiles
+    x = np.arange(len(percentiles))
+    for op in bencher.latency_ops:
+        fig, ax = plt.subplots()
+        for name, values in data.items():
+            if values:
+                ax.plot(x, [values["{}_{}".format(op, p)] for p in percentiles], marker="o", label=name)
+        ax.set_yscale("log")
+        ax.set_ylabel("{} latency (ns)".format(op))
+        ax.set_xticks(x)
+        ax.set_xticklabels(percentiles)
+        ax.set_title("{} {} latency percentiles".format(bencher.__name__, op))
+        ax.legend()
+        fig.tight_layout()
+        plt.savefig("output/{}-{}_percentiles.png".format(bencher.__name__, op))
+        plt.close(fig)